@@ -1,20 +1,36 @@
 from typing import Final
+import argparse
 import glob
 import pandas as pd
 from src.result_plotters import ResultPlotter
 from src.transmittance_plotter import TransmittancePlotter
-from src.electrical_and_thermal_power import ElectricalThermalPowerCalculator
-
-def get_df_of_temperatures_per_metric(heat_transfer_fluid_name: str, is_cooling: bool) -> pd.DataFrame:
+from src.electrical_and_thermal_power import ElectricalThermalPowerCalculator, SPECTRAL_FLUID_NAMES
+from src.energy_yield_simulator import EnergyYieldSimulator, get_temperature_coefficient
+from src.campaign_archive import RawCampaignLayout, open_campaign_archive
+from src.report_builder import ReportBuilder
+
+def get_df_of_temperatures_per_metric(heat_transfer_fluid_name: str, is_cooling: bool,
+                                      archive_path: str | None = None) -> pd.DataFrame:
+    """If archive_path is given, the run is read straight from a zipped campaign in the raw instrument layout,
+    e.g. archive/pvt-data.zip, rather than from the sorted data/ folders"""
     data_folder: Final[str] = "cooling" if is_cooling else "heating"
-    file_paths: Final[list[str]] = glob.glob(f"data/{data_folder}/{heat_transfer_fluid_name}/metrics/*")
-    temperature_data: Final[pd.DataFrame] = get_temperatures_from_picolog_data(heat_transfer_fluid_name=heat_transfer_fluid_name, is_cooling=is_cooling)
+    temperature_data: Final[pd.DataFrame] = get_temperatures_from_picolog_data(
+        heat_transfer_fluid_name=heat_transfer_fluid_name, is_cooling=is_cooling, archive_path=archive_path)
+
+    if archive_path is None:
+        file_paths: list[str] = glob.glob(f"data/{data_folder}/{heat_transfer_fluid_name}/metrics/*")
+        path_per_suffix: dict[str, str] = {path.split(" ")[-1].split(".csv")[0]: path for path in file_paths}
+        metric_per_path: dict[str, pd.DataFrame] = dict()
+    else:
+        layout: Final[RawCampaignLayout] = RawCampaignLayout(archive=open_campaign_archive(archive_path))
+        path_per_suffix = layout.get_metrics_members(heat_transfer_fluid_name=heat_transfer_fluid_name,
+                                                     is_cooling=is_cooling)
+        metric_per_path = layout.archive.read_csvs(list(path_per_suffix.values()))
 
     times_per_suffix = dict(zip(temperature_data["suffix"], temperature_data["time"]))
 
     metrics: list[pd.DataFrame] = list()
-    for path in file_paths:
-        file_suffix: str = path.split(" ")[-1].split(".csv")[0]
+    for file_suffix, path in path_per_suffix.items():
         if file_suffix == "(1)": # Measurement before light is turned on
             continue
 
@@ -22,7 +38,7 @@ def get_df_of_temperatures_per_metric(heat_transfer_fluid_name: str, is_cooling:
 
         print(f"{file_suffix} was recorded {time_recorded} in")
 
-        metric: pd.DataFrame = pd.read_csv(path)
+        metric: pd.DataFrame = metric_per_path[path] if archive_path is not None else pd.read_csv(path)
         metric.index = [time_recorded]
         metric["path"] = path
         metrics.append(metric)
@@ -32,10 +48,20 @@ def get_df_of_temperatures_per_metric(heat_transfer_fluid_name: str, is_cooling:
     metrics_and_temp_df: Final[pd.DataFrame] = pd.concat([metrics_df, temperature_data], axis=1).sort_index(axis=0)
     return metrics_and_temp_df
 
-def get_temperatures_from_picolog_data(heat_transfer_fluid_name: str, is_cooling: bool) -> pd.DataFrame:
+def get_temperatures_from_picolog_data(heat_transfer_fluid_name: str, is_cooling: bool,
+                                       archive_path: str | None = None) -> pd.DataFrame:
     data_folder: Final[str] = "cooling" if is_cooling else "heating"
-    temperatures: pd.DataFrame = pd.read_csv(f"data/{data_folder}/{heat_transfer_fluid_name}/temperature-by-file-end.csv")
-    picolog_data: pd.DataFrame = pd.read_csv(f"data/{data_folder}/_temperatures/{heat_transfer_fluid_name}.csv", index_col=0)[["Channel 3 Ave. (C)", "Channel 7 Ave. (C)"]]
+    if archive_path is None:
+        temperatures: pd.DataFrame = pd.read_csv(
+            f"data/{data_folder}/{heat_transfer_fluid_name}/temperature-by-file-end.csv")
+        picolog_data: pd.DataFrame = pd.read_csv(
+            f"data/{data_folder}/_temperatures/{heat_transfer_fluid_name}.csv", index_col=0)
+    else:
+        layout: Final[RawCampaignLayout] = RawCampaignLayout(archive=open_campaign_archive(archive_path))
+        picolog_data = layout.read_picolog(heat_transfer_fluid_name=heat_transfer_fluid_name)
+        temperatures = layout.get_temperature_times(heat_transfer_fluid_name=heat_transfer_fluid_name,
+                                                    is_cooling=is_cooling, logged_times=picolog_data.index)
+    picolog_data = picolog_data[["Channel 3 Ave. (C)", "Channel 7 Ave. (C)"]]
 
     relevant_temperatures: pd.DataFrame = picolog_data.loc[temperatures["time"]]
 
@@ -44,7 +70,8 @@ def get_temperatures_from_picolog_data(heat_transfer_fluid_name: str, is_cooling
 
     return combined_temp_data
 
-def plot_characteristics() -> None:
+def plot_characteristics(archive_path: str | None = None, report: ReportBuilder | None = None) -> None:
+    """Runs missing from the campaign archive, if one is given, are skipped"""
     fluid_names: Final[list[str]] = ["glycerol", "rhodamine-1pc", "rhodamine-2pc", "water"]
     cooling_fluid_names: Final[list[str]] = ["rhodamine-2pc"]
     cell_area: Final[float] = 0.07*0.15  # [metres]
@@ -52,9 +79,12 @@ def plot_characteristics() -> None:
 
     for fluid_name in fluid_names:
         print(f"Processing {fluid_name}")
-        metrics_and_temp_df: pd.DataFrame = get_df_of_temperatures_per_metric(heat_transfer_fluid_name=fluid_name, is_cooling=False)
+        metrics_and_temp_df: pd.DataFrame | None = _get_run_if_present(
+            heat_transfer_fluid_name=fluid_name, is_cooling=False, archive_path=archive_path)
+        if metrics_and_temp_df is None:
+            continue
 
-        result_plotter_obj: ResultPlotter = ResultPlotter(fluid_name=fluid_name)
+        result_plotter_obj: ResultPlotter = ResultPlotter(fluid_name=fluid_name, report=report)
 
         result_plotter_obj.plot_characteristics_vs_cell_temperature(metrics_and_temp_df=metrics_and_temp_df, cell_area=cell_area)
         result_plotter_obj.plot_characteristics_vs_fluid_temperature(metrics_and_temp_df=metrics_and_temp_df, cell_area=cell_area, is_cooling=False)
@@ -62,9 +92,12 @@ def plot_characteristics() -> None:
         result_plotter_obj.plot_fluid_and_cell_temperature_vs_time(metrics_and_temp_df=metrics_and_temp_df)
 
     for fluid_name in cooling_fluid_names:
-        result_plotter_obj: ResultPlotter = ResultPlotter(fluid_name=fluid_name)
+        result_plotter_obj: ResultPlotter = ResultPlotter(fluid_name=fluid_name, report=report)
 
-        metrics_and_temp_cooling_df: pd.DataFrame = get_df_of_temperatures_per_metric(heat_transfer_fluid_name=fluid_name, is_cooling=True)
+        metrics_and_temp_cooling_df: pd.DataFrame | None = _get_run_if_present(
+            heat_transfer_fluid_name=fluid_name, is_cooling=True, archive_path=archive_path)
+        if metrics_and_temp_cooling_df is None:
+            continue
 
         if fluid_name in {"rhodamine-2pc"}:
             result_plotter_obj.plot_characteristics_vs_fluid_temperature(metrics_and_temp_df=metrics_and_temp_cooling_df,
@@ -74,28 +107,78 @@ def plot_characteristics() -> None:
                                                                          cell_area=cell_area, is_cooling=True)
 
     print(f"Processing air")
-    metrics_and_temp_df: pd.DataFrame = get_df_of_temperatures_per_metric(heat_transfer_fluid_name="air", is_cooling=False)
-    ResultPlotter(fluid_name="air").plot_characteristics_vs_time(
-    metrics_and_temp_df=metrics_and_temp_df, cell_area=cell_area, is_cooling=False)
-
-def plot_transmittance_and_get_spectral_intensities() -> pd.DataFrame:
-    spectral_intensities: pd.DataFrame = pd.read_csv("data/spectrometer-and-final/spectral_data.csv", index_col=0)
-    result_plotter_obj: Final[TransmittancePlotter] = TransmittancePlotter()
+    metrics_and_temp_df = _get_run_if_present(heat_transfer_fluid_name="air", is_cooling=False,
+                                              archive_path=archive_path)
+    if metrics_and_temp_df is not None:
+        ResultPlotter(fluid_name="air", report=report).plot_characteristics_vs_time(
+        metrics_and_temp_df=metrics_and_temp_df, cell_area=cell_area, is_cooling=False)
+
+def _get_run_if_present(heat_transfer_fluid_name: str, is_cooling: bool,
+                        archive_path: str | None) -> pd.DataFrame | None:
+    try:
+        return get_df_of_temperatures_per_metric(heat_transfer_fluid_name=heat_transfer_fluid_name,
+                                                 is_cooling=is_cooling, archive_path=archive_path)
+    except FileNotFoundError as error:
+        if archive_path is None:
+            raise
+        print(f"Skipping {heat_transfer_fluid_name}: {error}")
+        return None
+
+def plot_transmittance_and_get_spectral_intensities(archive_path: str | None = None,
+                                                    report: ReportBuilder | None = None) -> pd.DataFrame:
+    """If archive_path is given, the spectra are built from the SpectraSuite .txt exports in that archive,
+    e.g. data/spectrometer-and-final.zip"""
+    if archive_path is None:
+        spectral_intensities: pd.DataFrame = pd.read_csv("data/spectrometer-and-final/spectral_data.csv", index_col=0)
+    else:
+        layout: Final[RawCampaignLayout] = RawCampaignLayout(archive=open_campaign_archive(archive_path))
+        spectral_intensities = layout.read_spectral_intensities()
+    result_plotter_obj: Final[TransmittancePlotter] = TransmittancePlotter(report=report)
     result_plotter_obj.plot_phase(spectral_intensities=spectral_intensities)
 
     return spectral_intensities
 
 def get_electrical_thermal_powers(spectral_intensities: pd.DataFrame):
     calculator_obj: Final[ElectricalThermalPowerCalculator] = ElectricalThermalPowerCalculator(spectral_intensities=spectral_intensities)
-    electrical_power = calculator_obj.get_electrical_power()
-    thermal_power = calculator_obj.get_thermal_power(electrical_power=electrical_power)
-    print(f"Electrical power: {electrical_power}")
-    print(f"Thermal power: {thermal_power}")
+    electrical_powers = calculator_obj.get_electrical_powers(fluid_names=list(spectral_intensities.columns))
+    thermal_powers = calculator_obj.get_thermal_powers(electrical_powers=electrical_powers)
+    print(f"Electrical power (relative):\n{electrical_powers}")
+    print(f"Thermal power (relative):\n{thermal_powers}")
     #calculator_obj.plot_phase()
 
+def get_annual_energy_yields(spectral_intensities: pd.DataFrame, weather_path: str,
+                             time_step_hours: float | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """time_step_hours is inferred from the weather data's timestamps unless given"""
+    fluid_names: Final[list[str]] = ["air", "glycerol", "rhodamine-2pc", "water"]
+
+    temperature_coefficients: Final[pd.Series] = pd.Series({
+        SPECTRAL_FLUID_NAMES.get(fluid_name, fluid_name): get_temperature_coefficient(
+            metrics_and_temp_df=get_df_of_temperatures_per_metric(heat_transfer_fluid_name=fluid_name,
+                                                                  is_cooling=False))
+        for fluid_name in fluid_names
+    })
+    calculator_obj: Final[ElectricalThermalPowerCalculator] = ElectricalThermalPowerCalculator(
+        spectral_intensities=spectral_intensities)
+    simulator_obj: Final[EnergyYieldSimulator] = EnergyYieldSimulator(
+        calculator=calculator_obj, temperature_coefficients=temperature_coefficients, time_step_hours=time_step_hours)
+
+    electrical_energy, thermal_energy = simulator_obj.get_annual_energy_from_file(weather_path=weather_path)
+    print(f"Annual electrical energy (relative power × h):\n{electrical_energy}")
+    print(f"Annual thermal energy (relative power × h):\n{thermal_energy}")
+    return electrical_energy, thermal_energy
+
 
 if __name__ == "__main__":
-    plot_characteristics()
-    spectral_intensities: Final[pd.DataFrame] = plot_transmittance_and_get_spectral_intensities()
+    parser = argparse.ArgumentParser(description="Plot PV-T characteristics, transmittances and powers")
+    parser.add_argument("--campaign-archive", default=None,
+                        help="Read the runs from a zipped campaign, e.g. archive/pvt-data.zip, instead of data/")
+    parser.add_argument("--spectra-archive", default=None,
+                        help="Read the spectra from a zip, e.g. data/spectrometer-and-final.zip, instead of data/")
+    args = parser.parse_args()
+
+    report: Final[ReportBuilder] = ReportBuilder()
+    plot_characteristics(archive_path=args.campaign_archive, report=report)
+    spectral_intensities: Final[pd.DataFrame] = plot_transmittance_and_get_spectral_intensities(
+        archive_path=args.spectra_archive, report=report)
+    report.write_html("output/report.html")
     get_electrical_thermal_powers(spectral_intensities=spectral_intensities)
-
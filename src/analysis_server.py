@@ -0,0 +1,302 @@
+import argparse
+import asyncio
+import glob
+import hashlib
+import io
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Final
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from main import get_df_of_temperatures_per_metric
+from src.electrical_and_thermal_power import ElectricalThermalPowerCalculator, SPECTRAL_FLUID_NAMES
+from src.energy_yield_simulator import get_temperature_coefficient
+
+
+class UnknownFluidError(LookupError):
+    """A fluid with no run or spectrum to answer from"""
+
+
+class DatasetCache:
+    """LRU cache of loaded datasets, each entry invalidated once any of the files it was loaded from changes"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries: Final[int] = max_entries
+        self._entries: Final[OrderedDict[tuple, tuple[Any, dict[str, int]]]] = OrderedDict()
+        self._loading: Final[dict[tuple, asyncio.Future]] = dict()
+
+    async def get(self, key: tuple, load: Callable[[], Any], dependency_paths: Callable[[], list[str]] | None = None,
+                  modified_times: dict[str, int] | None = None) -> Any:
+        """Cached value for key, else load() in a worker thread. Concurrent requests for the same key share one load.
+        A value derived from another entry passes that entry's modified_times instead of dependency_paths,
+        so it is invalidated together with the data it was derived from."""
+        value, _ = await self.get_entry(key=key, load=load, dependency_paths=dependency_paths,
+                                        modified_times=modified_times)
+        return value
+
+    async def get_entry(self, key: tuple, load: Callable[[], Any],
+                        dependency_paths: Callable[[], list[str]] | None = None,
+                        modified_times: dict[str, int] | None = None) -> tuple[Any, dict[str, int]]:
+        """get, along with the modified times of the files the value was loaded from"""
+        if modified_times is None:
+            modified_times = await asyncio.to_thread(self._get_modified_times, dependency_paths())
+
+        if key in self._entries:
+            value, cached_modified_times = self._entries[key]
+            if cached_modified_times == modified_times:
+                self._entries.move_to_end(key)
+                return value, cached_modified_times
+            del self._entries[key]
+
+        if key in self._loading:
+            return await asyncio.shield(self._loading[key])
+
+        loading: Final[asyncio.Future] = asyncio.get_running_loop().create_future()
+        self._loading[key] = loading
+        try:
+            value = await asyncio.to_thread(load)
+        except BaseException as error:
+            if isinstance(error, Exception):
+                loading.set_exception(error)
+                loading.exception()  # Mark as retrieved, in case no other request was waiting on it
+            else:
+                loading.cancel()
+            raise
+        finally:
+            del self._loading[key]
+
+        loading.set_result((value, modified_times))
+        self._entries[key] = (value, modified_times)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value, modified_times
+
+    @staticmethod
+    def _get_modified_times(paths: list[str]) -> dict[str, int]:
+        return {path: os.stat(path).st_mtime_ns for path in paths if os.path.exists(path)}
+
+
+class AnalysisServer:
+    """Long-running server answering analysis queries from in-memory datasets, over HTTP or a Unix socket.
+
+    GET /metrics?fluid=water&cooling=false      merged metrics and temperatures of one fluid
+    GET /power?fluid=water                      electrical and thermal power for one fluid's spectrum
+    POST /power[?fluid=water]                   the same for a spectrum CSV sent as the body, laid out as
+                                                spectral_data.csv with an "air" column; every fluid if none is given
+    GET /coefficients?fluid=water&cooling=false temperature coefficient of one run
+
+    Unknown fluids are answered with 404, and request bodies over max_body_bytes with 413."""
+
+    def __init__(self, spectral_data_path: str = "data/spectrometer-and-final/spectral_data.csv",
+                 max_entries: int = 64, max_body_bytes: int = 16*1024*1024):
+        self.spectral_data_path: Final[str] = spectral_data_path
+        self.max_body_bytes: Final[int] = max_body_bytes
+        self.cache: Final[DatasetCache] = DatasetCache(max_entries=max_entries)
+        self.routes: Final[dict[tuple[str, str], Callable]] = {
+            ("GET", "/metrics"): self.get_metrics,
+            ("GET", "/power"): self.get_power,
+            ("POST", "/power"): self.post_power,
+            ("GET", "/coefficients"): self.get_coefficients,
+        }
+        self.reference_data_paths: Final[list[str]] = [
+            "data/PV Solar Cell Spectral Response and AM1.5D Spectra.csv",
+            "data/am1-5g.csv",
+        ]
+
+    async def get_metrics_df(self, fluid: str, is_cooling: bool) -> pd.DataFrame:
+        metrics_and_temp_df, _ = await self._get_metrics_entry(fluid=fluid, is_cooling=is_cooling)
+        return metrics_and_temp_df
+
+    async def get_calculator(self, spectrum_csv: bytes | None = None) -> ElectricalThermalPowerCalculator:
+        """Calculator for the server's spectral data, or for a posted spectrum CSV, keyed by its digest"""
+        if spectrum_csv is None:
+            return await self.cache.get(
+                key=("calculator",),
+                load=lambda: ElectricalThermalPowerCalculator(
+                    spectral_intensities=pd.read_csv(self.spectral_data_path, index_col=0)),
+                dependency_paths=lambda: [self.spectral_data_path, *self.reference_data_paths],
+            )
+        return await self.cache.get(
+            key=("calculator", hashlib.sha256(spectrum_csv).hexdigest()),
+            load=lambda: ElectricalThermalPowerCalculator(
+                spectral_intensities=self._parse_spectrum(spectrum_csv=spectrum_csv)),
+            dependency_paths=lambda: self.reference_data_paths,
+        )
+
+    async def get_temperature_coefficient(self, fluid: str, is_cooling: bool) -> float:
+        metrics_and_temp_df, modified_times = await self._get_metrics_entry(fluid=fluid, is_cooling=is_cooling)
+        # Stored against the modified times the metrics were loaded at, so the fit is redone exactly when they are
+        return await self.cache.get(
+            key=("coefficient", fluid, is_cooling),
+            load=lambda: get_temperature_coefficient(metrics_and_temp_df=metrics_and_temp_df),
+            modified_times=modified_times,
+        )
+
+    async def get_metrics(self, query: dict[str, str], body: bytes) -> str:
+        metrics_and_temp_df: Final[pd.DataFrame] = await self.get_metrics_df(
+            fluid=self._get_parameter(query, "fluid"), is_cooling=self._parse_bool(query.get("cooling", "false")))
+        return metrics_and_temp_df.to_json(orient="split")
+
+    async def get_power(self, query: dict[str, str], body: bytes) -> str:
+        calculator: Final[ElectricalThermalPowerCalculator] = await self.get_calculator()
+        return self._get_powers_json(calculator=calculator, fluid_names=[self._get_parameter(query, "fluid")])
+
+    async def post_power(self, query: dict[str, str], body: bytes) -> str:
+        if not body:
+            raise ValueError("POST /power needs a spectrum CSV as the body")
+        calculator: Final[ElectricalThermalPowerCalculator] = await self.get_calculator(spectrum_csv=body)
+        fluid_names: Final[list[str]] = [query["fluid"]] if "fluid" in query else \
+            [column for column in calculator.spectral_intensities.columns if column != "air"]
+        return self._get_powers_json(calculator=calculator, fluid_names=fluid_names)
+
+    async def get_coefficients(self, query: dict[str, str], body: bytes) -> str:
+        temperature_coefficient: Final[float] = await self.get_temperature_coefficient(
+            fluid=self._get_parameter(query, "fluid"), is_cooling=self._parse_bool(query.get("cooling", "false")))
+        return json.dumps({"temperature_coefficient": temperature_coefficient})
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line: Final[bytes] = await reader.readline()
+            content_length: int = 0
+            while (header := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = header.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length" and value.strip().isdigit():
+                    content_length = int(value)
+
+            if content_length > self.max_body_bytes:
+                status, body = "413 Content Too Large", json.dumps(
+                    {"error": f"body of {content_length} bytes is over the limit of {self.max_body_bytes}"})
+            else:
+                try:
+                    request_body: bytes = await reader.readexactly(content_length) if content_length else b""
+                except asyncio.IncompleteReadError as error:
+                    status, body = "400 Bad Request", json.dumps(
+                        {"error": f"body ended after {len(error.partial)} of {content_length} bytes"})
+                else:
+                    status, body = await self.respond(request_line.decode("latin-1"), body=request_body)
+
+            encoded_body: Final[bytes] = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(encoded_body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + encoded_body)
+            await writer.drain()
+        except ConnectionError:
+            pass  # The client went away; there is no one left to answer
+        finally:
+            writer.close()
+
+    async def respond(self, request_line: str, body: bytes = b"") -> tuple[str, str]:
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            return "400 Bad Request", json.dumps({"error": "malformed request line"})
+
+        url: Final = urlsplit(target)
+        if (method, url.path) not in self.routes:
+            if any(path == url.path for _, path in self.routes):
+                return "405 Method Not Allowed", json.dumps({"error": f"{method} is not supported on {url.path}"})
+            return "404 Not Found", json.dumps({"error": f"no route {url.path}"})
+        query: Final[dict[str, str]] = {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+        try:
+            return "200 OK", await self.routes[(method, url.path)](query, body)
+        except UnknownFluidError as error:
+            return "404 Not Found", json.dumps({"error": str(error)})
+        except ValueError as error:
+            return "400 Bad Request", json.dumps({"error": str(error)})
+        except Exception as error:
+            return "500 Internal Server Error", json.dumps({"error": f"{type(error).__name__}: {error}"})
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, unix_socket_path: str | None = None) -> None:
+        if unix_socket_path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_socket_path)
+            print(f"Serving on {unix_socket_path}")
+        else:
+            server = await asyncio.start_server(self.handle_connection, host=host, port=port)
+            print(f"Serving on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    async def _get_metrics_entry(self, fluid: str, is_cooling: bool) -> tuple[pd.DataFrame, dict[str, int]]:
+        data_folder: Final[str] = "cooling" if is_cooling else "heating"
+        run_paths: Final[list[str]] = [
+            f"data/{data_folder}/{fluid}/metrics",
+            f"data/{data_folder}/{fluid}/temperature-by-file-end.csv",
+            f"data/{data_folder}/_temperatures/{fluid}.csv",
+        ]
+        if fluid.startswith("_") or not all(os.path.exists(path) for path in run_paths):
+            raise UnknownFluidError(f"no {data_folder} run for {fluid}")
+        return await self.cache.get_entry(
+            key=("metrics", fluid, is_cooling),
+            load=lambda: get_df_of_temperatures_per_metric(heat_transfer_fluid_name=fluid, is_cooling=is_cooling),
+            dependency_paths=lambda: self._get_run_paths(fluid=fluid, is_cooling=is_cooling),
+        )
+
+    @staticmethod
+    def _get_run_paths(fluid: str, is_cooling: bool) -> list[str]:
+        """Files a run's metrics are loaded from. The metrics folder itself is included so that added or
+        removed metric files are noticed too"""
+        data_folder: Final[str] = "cooling" if is_cooling else "heating"
+        return [
+            f"data/{data_folder}/{fluid}/metrics",
+            *glob.glob(f"data/{data_folder}/{fluid}/metrics/*"),
+            f"data/{data_folder}/{fluid}/temperature-by-file-end.csv",
+            f"data/{data_folder}/_temperatures/{fluid}.csv",
+        ]
+
+    @staticmethod
+    def _get_powers_json(calculator: ElectricalThermalPowerCalculator, fluid_names: list[str]) -> str:
+        """Powers of fluid_names, which may be spelled as their run folders, e.g. rhodamine-2pc"""
+        spectral_fluid_names: Final[list[str]] = [
+            SPECTRAL_FLUID_NAMES.get(fluid_name, fluid_name) for fluid_name in fluid_names
+        ]
+        for fluid_name, spectral_fluid_name in zip(fluid_names, spectral_fluid_names):
+            if spectral_fluid_name not in calculator.spectral_intensities.columns:
+                raise UnknownFluidError(f"no spectrum for {fluid_name}")
+
+        electrical_powers: Final[pd.Series] = calculator.get_electrical_powers(fluid_names=spectral_fluid_names)
+        thermal_powers: Final[pd.Series] = calculator.get_thermal_powers(electrical_powers=electrical_powers)
+        if len(fluid_names) == 1:
+            return json.dumps({"electrical_power": electrical_powers.iloc[0], "thermal_power": thermal_powers.iloc[0]})
+        return json.dumps({fluid_name: {"electrical_power": electrical_powers[spectral_fluid_name],
+                                        "thermal_power": thermal_powers[spectral_fluid_name]}
+                           for fluid_name, spectral_fluid_name in zip(fluid_names, spectral_fluid_names)})
+
+    @staticmethod
+    def _parse_spectrum(spectrum_csv: bytes) -> pd.DataFrame:
+        try:
+            spectral_intensities: Final[pd.DataFrame] = pd.read_csv(io.BytesIO(spectrum_csv), index_col=0)
+        except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as error:
+            raise ValueError(f"Spectrum is not a readable CSV: {error}") from error
+        if "air" not in spectral_intensities.columns:
+            raise ValueError("Spectrum needs an air column, which transmittances are taken relative to")
+        return spectral_intensities
+
+    @staticmethod
+    def _get_parameter(query: dict[str, str], name: str) -> str:
+        if name not in query:
+            raise ValueError(f"missing parameter {name}")
+        return query[name]
+
+    @staticmethod
+    def _parse_bool(value: str) -> bool:
+        if value.lower() not in {"true", "false", "1", "0"}:
+            raise ValueError(f"{value} is not a boolean")
+        return value.lower() in {"true", "1"}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve PV-T analysis queries from in-memory datasets")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", default=None, help="Serve on this Unix socket instead of TCP")
+    parser.add_argument("--spectral-data", default="data/spectrometer-and-final/spectral_data.csv")
+    parser.add_argument("--max-entries", type=int, default=64, help="Datasets kept in memory before LRU eviction")
+    args = parser.parse_args()
+
+    server_obj: Final[AnalysisServer] = AnalysisServer(spectral_data_path=args.spectral_data,
+                                                       max_entries=args.max_entries)
+    asyncio.run(server_obj.serve(host=args.host, port=args.port, unix_socket_path=args.unix_socket))
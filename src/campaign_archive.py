@@ -0,0 +1,235 @@
+import datetime
+import fnmatch
+import io
+import os
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import BinaryIO, Final
+
+import pandas as pd
+
+
+class CampaignArchive:
+    """Read-only view of a zipped measurement campaign, so CSVs can be parsed
+    straight from the archive without extracting it to disk first"""
+
+    def __init__(self, archive_path: str | BinaryIO, name: str | None = None, max_workers: int | None = None,
+                 max_cached_csvs: int = 512):
+        self.name: Final[str] = name if name is not None else str(archive_path)
+        self.max_workers: Final[int | None] = max_workers
+        self.max_cached_csvs: Final[int] = max_cached_csvs
+        self.zip_file: Final[zipfile.ZipFile] = zipfile.ZipFile(archive_path)
+
+        # Member-name index, built once: lookups and globbing never rescan the central directory
+        self.members: Final[dict[str, zipfile.ZipInfo]] = {
+            info.filename: info for info in self.zip_file.infolist() if not info.is_dir()
+        }
+
+        self._parsed_csvs: Final[OrderedDict[tuple, pd.DataFrame]] = OrderedDict()
+        self._parsed_csvs_lock: Final[Lock] = Lock()
+        self._nested_archives: Final[dict[str, CampaignArchive]] = dict()
+
+    def glob(self, pattern: str) -> list[str]:
+        """Member names matching a glob pattern, e.g. "pvt-data/water/Device 1 Metrics*" """
+        return [member for member in self.members if fnmatch.fnmatchcase(member, pattern)]
+
+    def get_info(self, member: str) -> zipfile.ZipInfo:
+        if member not in self.members:
+            raise FileNotFoundError(f"{member} is not in {self.name}")
+        return self.members[member]
+
+    def read_bytes(self, member: str) -> bytes:
+        return self.zip_file.read(self.get_info(member))
+
+    def read_csv(self, member: str, **read_csv_kwargs) -> pd.DataFrame:
+        """Parse one member CSV, reusing the cached result if it was already parsed with the same arguments.
+        Calls with arguments that cannot be compared, e.g. a callable usecols, are parsed without the cache."""
+        info: Final[zipfile.ZipInfo] = self.get_info(member)
+
+        cache_key: Final[tuple] = (member, _freeze(read_csv_kwargs))
+        try:
+            hash(cache_key)
+        except TypeError:
+            return self._parse_csv(info, **read_csv_kwargs)
+
+        with self._parsed_csvs_lock:
+            cached: pd.DataFrame | None = self._parsed_csvs.get(cache_key)
+            if cached is not None:
+                self._parsed_csvs.move_to_end(cache_key)
+        if cached is not None:
+            return cached.copy()
+
+        parsed: Final[pd.DataFrame] = self._parse_csv(info, **read_csv_kwargs)
+        with self._parsed_csvs_lock:
+            self._parsed_csvs[cache_key] = parsed
+            while len(self._parsed_csvs) > self.max_cached_csvs:
+                self._parsed_csvs.popitem(last=False)
+        return parsed.copy()
+
+    def read_csvs(self, members: list[str], **read_csv_kwargs) -> dict[str, pd.DataFrame]:
+        """Parse several member CSVs in parallel, keyed by member name"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            parsed = executor.map(lambda member: self.read_csv(member, **read_csv_kwargs), members)
+            return dict(zip(members, parsed))
+
+    def open_nested(self, member: str) -> "CampaignArchive":
+        """An archive stored inside this one, read into memory once rather than extracted to disk"""
+        with self._parsed_csvs_lock:
+            if member not in self._nested_archives:
+                self._nested_archives[member] = CampaignArchive(
+                    archive_path=io.BytesIO(self.read_bytes(member)), name=f"{self.name}/{member}",
+                    max_workers=self.max_workers, max_cached_csvs=self.max_cached_csvs)
+            return self._nested_archives[member]
+
+    def _parse_csv(self, info: zipfile.ZipInfo, **read_csv_kwargs) -> pd.DataFrame:
+        with self.zip_file.open(info) as member_file:
+            return pd.read_csv(member_file, **read_csv_kwargs)
+
+    def close(self) -> None:
+        for nested_archive in self._nested_archives.values():
+            nested_archive.close()
+        self.zip_file.close()
+
+    def __enter__(self) -> "CampaignArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _freeze(value):
+    """Hashable stand-in for read_csv arguments, so lists and dicts can be part of a cache key"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(_freeze(item) for item in value)
+    return value
+
+
+_open_archives: Final[dict[str, tuple[int, CampaignArchive]]] = dict()
+_open_archives_lock: Final[Lock] = Lock()
+
+
+def open_campaign_archive(archive_path: str) -> CampaignArchive:
+    """Shared CampaignArchive per archive, so repeated loads reuse its index and parsed CSVs.
+    A rewritten archive (new modification time) replaces the previous instance for new callers."""
+    path: Final[str] = os.path.abspath(archive_path)
+    modified_time_ns: Final[int] = os.stat(path).st_mtime_ns
+    with _open_archives_lock:
+        if path in _open_archives:
+            opened_modified_time_ns, archive = _open_archives[path]
+            if opened_modified_time_ns == modified_time_ns:
+                return archive
+            # Not closed here: loads still running on the previous instance keep using it until they finish,
+            # and it is closed by ZipFile's own finaliser once no one holds it
+
+        archive = CampaignArchive(archive_path=path)
+        _open_archives[path] = (modified_time_ns, archive)
+        return archive
+
+
+class RawCampaignLayout:
+    """Measurements laid out as the instruments wrote them, e.g. archive/pvt-data.zip:
+    <root>/<run folder>/Device 1 Metrics (n).csv and <root>/picolog/<fluid>.csv.
+
+    There is no temperature-by-file-end.csv in this layout, so each measurement's time is taken from its
+    modification time relative to the first measurement of the run, snapped to the nearest logged temperature.
+    Measurements modified before the first one, i.e. re-saved out of order, are dropped. Cooling runs are not
+    separated by fluid in this layout and are not supported."""
+
+    def __init__(self, archive: CampaignArchive):
+        # The OneDrive export's own timestamps are those of the export, but it carries the original pvt-data.zip
+        nested_archives: Final[list[str]] = archive.glob("*pvt-data.zip")
+        self.archive: Final[CampaignArchive] = archive.open_nested(nested_archives[0]) if nested_archives else archive
+
+        self.run_folders: Final[dict[str, str]] = {
+            "air": "no-liquid",
+            "glycerol": "glycerol",
+            "lumogen-f-rot-2pc": "lumogen-f-rot/2pc",
+            "rhodamine-1pc": "rhodamine/1pc",
+            "rhodamine-2pc": "rhodamine/2pc",
+            "water": "water",
+        }
+
+    def get_metrics_members(self, heat_transfer_fluid_name: str, is_cooling: bool) -> dict[str, str]:
+        """Member of each measurement of a run, keyed by its file suffix, e.g. "(2)" """
+        return {suffix: member for suffix, (member, _) in
+                self._get_measurement_offsets(heat_transfer_fluid_name=heat_transfer_fluid_name,
+                                              is_cooling=is_cooling).items()}
+
+    def read_picolog(self, heat_transfer_fluid_name: str) -> pd.DataFrame:
+        picolog_members: Final[list[str]] = self.archive.glob(f"*/picolog/{heat_transfer_fluid_name}.csv")
+        if not picolog_members:
+            raise FileNotFoundError(f"No picolog temperatures for {heat_transfer_fluid_name} in {self.archive.name}")
+        return self.archive.read_csv(picolog_members[0], index_col=0)
+
+    def get_temperature_times(self, heat_transfer_fluid_name: str, is_cooling: bool,
+                              logged_times: pd.Index) -> pd.DataFrame:
+        """Equivalent of temperature-by-file-end.csv: the logged time at which each measurement was saved"""
+        offsets: Final[dict[str, tuple[str, int]]] = self._get_measurement_offsets(
+            heat_transfer_fluid_name=heat_transfer_fluid_name, is_cooling=is_cooling)
+        suffixes: Final[list[str]] = sorted(offsets, key=lambda suffix: offsets[suffix][1])
+
+        logged_timedeltas: Final[pd.TimedeltaIndex] = pd.to_timedelta(logged_times)
+        nearest: Final = logged_timedeltas.get_indexer(
+            pd.to_timedelta([offsets[suffix][1] for suffix in suffixes], unit="s"), method="nearest")
+        return pd.DataFrame(data={"suffix": suffixes, "time": logged_times[nearest]})
+
+    def read_spectral_intensities(self) -> pd.DataFrame:
+        """The equivalent of spectral_data.csv, built from the SpectraSuite .txt exports: intensity per
+        wavelength (rows) for each fluid (columns, named after the file). As in spectral_data.csv, wavelengths
+        where the air reference is zero, i.e. the detector's first pixel, are dropped."""
+        begin_marker: Final[str] = ">>>>>Begin Processed Spectral Data<<<<<"
+        end_marker: Final[str] = ">>>>>End Processed Spectral Data<<<<<"
+
+        spectra: dict[str, pd.Series] = dict()
+        for member in sorted(self.archive.glob("*.txt")):
+            text: str = self.archive.read_bytes(member).decode("utf-8", errors="replace")
+            if begin_marker not in text:
+                continue
+            spectral_data: str = text.split(begin_marker, 1)[1].split(end_marker, 1)[0]
+            spectrum: pd.DataFrame = pd.read_csv(io.StringIO(spectral_data.strip()), sep="\t", header=None, index_col=0)
+            spectra[os.path.splitext(os.path.basename(member))[0]] = spectrum[1].astype(float)
+
+        if not spectra:
+            raise FileNotFoundError(f"No SpectraSuite spectra in {self.archive.name}")
+        spectral_intensities: pd.DataFrame = pd.DataFrame(data=spectra)
+        if "air" in spectral_intensities.columns:
+            spectral_intensities = spectral_intensities[spectral_intensities["air"] != 0]
+        spectral_intensities.index.name = "wavelength (nm)"
+        return spectral_intensities
+
+    def _get_measurement_offsets(self, heat_transfer_fluid_name: str, is_cooling: bool) -> dict[str, tuple[str, int]]:
+        """Member and seconds since the first measurement, keyed by file suffix"""
+        if is_cooling:
+            raise FileNotFoundError(f"Cooling runs are not separated by fluid in {self.archive.name}")
+        if heat_transfer_fluid_name not in self.run_folders:
+            raise FileNotFoundError(f"No run folder for {heat_transfer_fluid_name} in {self.archive.name}")
+
+        members: Final[list[str]] = self.archive.glob(
+            f"*/{self.run_folders[heat_transfer_fluid_name]}/Device 1 Metrics*.csv")
+        if not members:
+            raise FileNotFoundError(f"No metrics for {heat_transfer_fluid_name} in {self.archive.name}")
+
+        # The instrument names the first measurement without a number, then (2), (3), ...
+        suffix_per_member: Final[dict[str, str]] = {
+            member: "(1)" if member.endswith("Metrics.csv") else member.split(" ")[-1].split(".csv")[0]
+            for member in members
+        }
+        saved_at: Final[dict[str, datetime.datetime]] = {
+            member: datetime.datetime(*self.archive.get_info(member).date_time) for member in members
+        }
+        first_saved_at: Final[datetime.datetime] = min(
+            (saved_at[member] for member in members if suffix_per_member[member] == "(1)"),
+            default=min(saved_at.values()))
+
+        offsets: dict[str, tuple[str, int]] = dict()
+        for member in members:
+            seconds: int = int((saved_at[member] - first_saved_at).total_seconds())
+            if seconds >= 0:
+                offsets[suffix_per_member[member]] = (member, seconds)
+        return offsets
@@ -4,7 +4,10 @@ import numpy as np
 import os
 import plotly.express as px
 import scipy.integrate as integrate
-from math import floor, isnan
+from math import ceil, floor
+
+# Columns of spectral_data.csv spelled differently from the fluid's run folders
+SPECTRAL_FLUID_NAMES: Final[dict[str, str]] = {"rhodamine-2pc": "rhodaine-2pc"}
 
 class ElectricalThermalPowerCalculator:
     def __init__(self, spectral_intensities: pd.DataFrame):
@@ -20,37 +23,52 @@ class ElectricalThermalPowerCalculator:
         self.spectral_intensities: Final[pd.DataFrame] = spectral_intensities
         print("aaa")
 
-    def get_electrical_power(self) -> float:
+    def get_electrical_power(self, fluid_name: str = "air") -> float:
+        return self.get_electrical_powers(fluid_names=[fluid_name]).iloc[0]
+
+    def get_thermal_power(self, electrical_power: float) -> float:
+        return self.get_thermal_powers(electrical_powers=pd.Series(data=[electrical_power])).iloc[0]
 
-        max_wavelength: Final[int] = len(self.am1_5g_spectra_df.index) - 1 if len(self.am1_5g_spectra_df.index) < 2000 else 2000
-        result = integrate.quad(lambda wavelength: self.electrical_power_integral_functions(wavelength), 250, max_wavelength)
-        return result[0]
+    def get_electrical_powers(self, fluid_names: list[str]) -> pd.Series:
+        """Integral of phi * SR * T_liquid over wavelength for each fluid, with the transmittance T_liquid of each
+        fluid taken relative to air. Every factor is interpolated onto one whole-nanometre grid by its measured
+        wavelength, covering only the wavelengths where all of them were measured.
 
-    def electrical_power_integral_functions(self, wavelength: float) -> float:
-        return self.phi_am1point5d(wavelength) * self.SR(wavelength) * self.T_liquid(wavelength)
+        The result is a relative figure of merit for comparing fluids, not a power in watts."""
+        wavelengths: Final[np.ndarray] = self._get_integration_wavelengths()
+        phi: Final[np.ndarray] = self._interpolate(self.spectra_df, wavelengths=wavelengths)
+        spectral_response: Final[np.ndarray] = self._interpolate(
+            self.am1_5g_spectra_df["Cumulative photon flux (cm–2⋅s–1)"], wavelengths=wavelengths)
 
-    def get_thermal_power(self, electrical_power: float) -> float:
-        max_wavelength: Final[int] = len(self.am1_5g_spectra_df.index) - 1 if len(
-            self.am1_5g_spectra_df.index) < 2000 else 2000
-        return electrical_power/(integrate.quad(lambda wavelength: self.phi_am1point5d(wavelength), 250, max_wavelength)[0])
-
-    def phi_am1point5d(self, wavelength: float) -> float:
-        """Photon flux contained in the standardised AM1.5G solar spectrum"""
-        phi_am1point5d: float = self.spectral_response_and_spectra_df.iloc[round(wavelength)]["Spectral Response of solar cell (A W-1)"]
-
-        if isnan(phi_am1point5d):
-            return 0
-        else:
-            return phi_am1point5d
-
-    def SR(self, wavelength: float) -> float:
-        """Spectral response of cell"""
-        return self.am1_5g_spectra_df.iloc[round(wavelength)]["Cumulative photon flux (cm–2⋅s–1)"]
-
-    def T_liquid(self, wavelength: float) -> float:
-        """Optical transmittance of the filter, in absence of interactions
-        with interface"""
-        return self.spectral_intensities.iloc[round(wavelength)]["air"]
+        relative_intensities: Final[pd.DataFrame] = self.spectral_intensities[fluid_names].div(
+            self.spectral_intensities["air"], axis=0)
+        transmittances: Final[np.ndarray] = np.column_stack([
+            self._interpolate(relative_intensities[fluid_name], wavelengths=wavelengths) for fluid_name in fluid_names
+        ])
+
+        integrand: Final[np.ndarray] = (phi * spectral_response)[:, np.newaxis] * transmittances
+        return pd.Series(data=integrate.trapezoid(integrand, x=wavelengths, axis=0), index=fluid_names)
+
+    def get_thermal_powers(self, electrical_powers: pd.Series) -> pd.Series:
+        """Each electrical power over the integral of phi, taken over the same wavelengths as the electrical power"""
+        wavelengths: Final[np.ndarray] = self._get_integration_wavelengths()
+        phi: Final[np.ndarray] = self._interpolate(self.spectra_df, wavelengths=wavelengths)
+        return electrical_powers/integrate.trapezoid(phi, x=wavelengths)
+
+    def _get_integration_wavelengths(self) -> np.ndarray:
+        """Whole nanometres from 250 to 2000 nm that every integrated series covers"""
+        indexes: Final[list[pd.Index]] = [
+            self.spectra_df.index, self.am1_5g_spectra_df.index, self.spectral_intensities.index
+        ]
+        lower: Final[int] = ceil(max([250] + [index.min() for index in indexes]))
+        upper: Final[int] = floor(min([2000] + [index.max() for index in indexes]))
+        return np.arange(lower, upper + 1, dtype=float)
+
+    @staticmethod
+    def _interpolate(series: pd.Series, wavelengths: np.ndarray) -> np.ndarray:
+        """series, indexed by wavelength [nm], linearly interpolated at wavelengths, ignoring unusable samples"""
+        values: Final[pd.Series] = series.replace([np.inf, -np.inf], np.nan).dropna().sort_index()
+        return np.interp(wavelengths, values.index.to_numpy(dtype=float), values.to_numpy(dtype=float))
 
     def plot_phase(self) -> None:
         fig = px.scatter(
@@ -0,0 +1,132 @@
+from typing import Final, Iterator
+
+import numpy as np
+import pandas as pd
+
+from src.electrical_and_thermal_power import ElectricalThermalPowerCalculator
+
+
+def get_temperature_coefficient(metrics_and_temp_df: pd.DataFrame, reference_temperature: float = 25) -> float:
+    """Relative temperature coefficient of maximum power [1/°C], from a linear fit of the measured
+    maximum power against PV cell temperature"""
+    measurements: Final[pd.DataFrame] = metrics_and_temp_df[["Channel 3 Ave. (C)", "Maximum Power (W)"]].dropna()
+    slope, intercept = np.polyfit(measurements["Channel 3 Ave. (C)"], measurements["Maximum Power (W)"], 1)
+    return slope/(intercept + slope*reference_temperature)
+
+
+class EnergyYieldSimulator:
+    """Electrical and thermal energy per time step for every fluid at once, from a series of
+    irradiance and ambient temperature.
+
+    Powers at reference irradiance follow ElectricalThermalPowerCalculator, scale linearly with irradiance,
+    and the electrical power is derated by each fluid's measured temperature coefficient. Cell temperature
+    is estimated from the ambient temperature with the NOCT model. As the calculator's powers are relative figures
+    of merit rather than watts, energies are in those relative power units times hours, for comparing fluids.
+
+    Unless time_step_hours is given, the time step is inferred from the spacing of the weather data's datetime
+    index, per site, and data that is not evenly spaced is refused."""
+
+    def __init__(self, calculator: ElectricalThermalPowerCalculator, temperature_coefficients: pd.Series,
+                 time_step_hours: float | None = None, noct: float = 45, reference_irradiance: float = 1000,
+                 reference_temperature: float = 25):
+        self.fluid_names: Final[list[str]] = list(temperature_coefficients.index)
+        self.time_step_hours: Final[float | None] = time_step_hours
+        self.noct: Final[float] = noct
+        self.reference_irradiance: Final[float] = reference_irradiance
+        self.reference_temperature: Final[float] = reference_temperature
+
+        self.irradiance_column: Final[str] = "Irradiance (W m-2)"
+        self.ambient_temperature_column: Final[str] = "Ambient Temperature (C)"
+        self.site_column: Final[str] = "site"
+
+        electrical_powers: Final[pd.Series] = calculator.get_electrical_powers(fluid_names=self.fluid_names)
+        self.electrical_powers: Final[np.ndarray] = electrical_powers.to_numpy()
+        self.thermal_powers: Final[np.ndarray] = calculator.get_thermal_powers(
+            electrical_powers=electrical_powers).to_numpy()
+        self.temperature_coefficients: Final[np.ndarray] = temperature_coefficients.to_numpy(dtype=float)
+
+    def get_time_step_hours(self, weather_df: pd.DataFrame, previous_times: pd.Series | None = None,
+                            default: float | None = None) -> float:
+        """previous_times is each site's last time before weather_df, so the spacing into weather_df is checked too.
+        default is returned when there is no spacing to infer from, e.g. a chunk with one row per site."""
+        if self.time_step_hours is not None:
+            return self.time_step_hours
+
+        steps: Final[pd.Series] = self._get_times(weather_df=weather_df, previous_times=previous_times).groupby(
+            level=0, sort=False).diff().dropna()
+        if steps.empty:
+            if default is not None:
+                return default
+            raise ValueError("Cannot infer the time step from fewer than two time steps per site")
+        if steps.nunique() != 1:
+            raise ValueError(f"Weather data is not evenly spaced in time: steps of {sorted(steps.unique())}")
+        return steps.iloc[0]/pd.Timedelta(hours=1)
+
+    def get_last_times(self, weather_df: pd.DataFrame, previous_times: pd.Series | None = None) -> pd.Series:
+        """Last time of each site, in weather_df or else in previous_times"""
+        return self._get_times(weather_df=weather_df, previous_times=previous_times).groupby(level=0).last()
+
+    def simulate(self, weather_df: pd.DataFrame,
+                 time_step_hours: float | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Electrical and thermal energy per time step (rows) and fluid (columns)"""
+        step_hours: Final[float] = time_step_hours if time_step_hours is not None \
+            else self.get_time_step_hours(weather_df=weather_df)
+        irradiance: Final[np.ndarray] = weather_df[self.irradiance_column].to_numpy(dtype=float)
+        ambient_temperature: Final[np.ndarray] = weather_df[self.ambient_temperature_column].to_numpy(dtype=float)
+
+        cell_temperature: Final[np.ndarray] = ambient_temperature + irradiance*(self.noct - 20)/800
+        irradiance_fraction: Final[np.ndarray] = (irradiance/self.reference_irradiance)[:, np.newaxis]
+        derating: Final[np.ndarray] = 1 + np.outer(cell_temperature - self.reference_temperature,
+                                                   self.temperature_coefficients)
+
+        electrical_energy: Final[np.ndarray] = irradiance_fraction*self.electrical_powers*derating*step_hours
+        thermal_energy: Final[np.ndarray] = irradiance_fraction*self.thermal_powers*step_hours
+
+        return (pd.DataFrame(data=electrical_energy, index=weather_df.index, columns=self.fluid_names),
+                pd.DataFrame(data=thermal_energy, index=weather_df.index, columns=self.fluid_names))
+
+    def simulate_file(self, weather_path: str,
+                      chunksize: int = 8760*32) -> Iterator[tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+        """Simulate a weather CSV too large to hold at once, e.g. many sites over many years.
+        Yields each chunk of the weather data with its electrical and thermal energy."""
+        time_step_hours: float | None = None
+        last_times: pd.Series | None = None
+        for weather_chunk in pd.read_csv(weather_path, index_col=0, parse_dates=True, chunksize=chunksize):
+            # Spacing is checked from each site's last time in the previous chunk, so gaps at chunk boundaries
+            # are caught, and a chunk without spacing of its own, e.g. a new site's only row, keeps the step so far
+            chunk_time_step_hours: float = self.get_time_step_hours(weather_df=weather_chunk,
+                                                                    previous_times=last_times, default=time_step_hours)
+            if time_step_hours is not None and chunk_time_step_hours != time_step_hours:
+                raise ValueError(
+                    f"Weather data changes time step from {time_step_hours} h to {chunk_time_step_hours} h")
+            time_step_hours = chunk_time_step_hours
+            last_times = self.get_last_times(weather_df=weather_chunk, previous_times=last_times)
+
+            electrical_energy, thermal_energy = self.simulate(weather_df=weather_chunk, time_step_hours=time_step_hours)
+            yield weather_chunk, electrical_energy, thermal_energy
+
+    def get_annual_energy_from_file(self, weather_path: str,
+                                    chunksize: int = 8760*32) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Electrical and thermal energy per fluid, summed per site (if the file has a site column) and year"""
+        electrical_per_chunk: list[pd.DataFrame] = list()
+        thermal_per_chunk: list[pd.DataFrame] = list()
+        for weather_chunk, electrical_energy, thermal_energy in self.simulate_file(weather_path=weather_path,
+                                                                                   chunksize=chunksize):
+            groups: list = [weather_chunk.index.year.rename("year")]
+            if self.site_column in weather_chunk.columns:
+                groups.insert(0, pd.Index(weather_chunk[self.site_column], name=self.site_column))
+
+            electrical_per_chunk.append(electrical_energy.groupby(groups).sum())
+            thermal_per_chunk.append(thermal_energy.groupby(groups).sum())
+
+        # A site-year can straddle two chunks, so sum the partial totals again
+        level: Final[list[int]] = list(range(electrical_per_chunk[0].index.nlevels))
+        return (pd.concat(electrical_per_chunk).groupby(level=level).sum(),
+                pd.concat(thermal_per_chunk).groupby(level=level).sum())
+
+    def _get_times(self, weather_df: pd.DataFrame, previous_times: pd.Series | None) -> pd.Series:
+        """Times of weather_df, indexed by site, after previous_times"""
+        sites: Final = weather_df[self.site_column].to_numpy() if self.site_column in weather_df.columns \
+            else np.zeros(len(weather_df), dtype=int)
+        times: Final[pd.Series] = pd.Series(data=weather_df.index, index=sites)
+        return times if previous_times is None else pd.concat([previous_times, times])
@@ -0,0 +1,144 @@
+import base64
+import html
+import json
+import os
+from typing import Final
+
+import numpy as np
+import plotly.graph_objects as go
+from _plotly_utils.basevalidators import DataArrayValidator
+from plotly.basedatatypes import BasePlotlyType
+from plotly.offline import get_plotlyjs
+from plotly.utils import PlotlyJSONEncoder
+
+# Plotly's typed-array dtype codes, the same {"dtype", "bdata"} shape newer plotly.js versions read natively
+_DTYPE_CODES: Final[dict[str, str]] = {"float64": "f8", "float32": "f4", "int32": "i4", "int16": "i2",
+                                       "int8": "i1", "uint32": "u4", "uint16": "u2", "uint8": "u1"}
+
+_MATHJAX_SCRIPT: Final[str] = \
+    '<script src="https://cdn.jsdelivr.net/npm/mathjax@2/MathJax.js?config=TeX-AMS-MML_SVG"></script>\n'
+
+_DECODE_AND_LAZY_PLOT_JS: Final[str] = """
+const typedArrayTypes = {f8: Float64Array, f4: Float32Array, i4: Int32Array, i2: Int16Array, i1: Int8Array,
+                         u4: Uint32Array, u2: Uint16Array, u1: Uint8Array};
+
+function decodeTypedArrays(value) {
+    if (Array.isArray(value)) {
+        return value.map(decodeTypedArrays);
+    }
+    if (value !== null && typeof value === "object") {
+        if (typeof value.bdata === "string" && value.dtype in typedArrayTypes) {
+            const bytes = Uint8Array.from(atob(value.bdata), (character) => character.charCodeAt(0));
+            return new typedArrayTypes[value.dtype](bytes.buffer);
+        }
+        for (const key of Object.keys(value)) {
+            value[key] = decodeTypedArrays(value[key]);
+        }
+    }
+    return value;
+}
+
+function plotFigure(figureDiv) {
+    const figure = decodeTypedArrays(JSON.parse(document.getElementById(figureDiv.dataset.figure).textContent));
+    Plotly.newPlot(figureDiv, figure.data, figure.layout, {responsive: true});
+}
+
+const observer = new IntersectionObserver((entries) => {
+    for (const entry of entries) {
+        if (entry.isIntersecting) {
+            observer.unobserve(entry.target);
+            plotFigure(entry.target);
+        }
+    }
+}, {rootMargin: "200px"});
+document.querySelectorAll("div[data-figure]").forEach((figureDiv) => observer.observe(figureDiv));
+"""
+
+
+class ReportBuilder:
+    """Collects the figures of a run into one HTML report, with a single embedded plotly.js,
+    trace arrays stored as base64 typed binary, and figures plotted only once scrolled into view"""
+
+    def __init__(self, title: str = "PV-T Characterization Report", include_mathjax: bool = True):
+        self.title: Final[str] = title
+        self.include_mathjax: Final[bool] = include_mathjax
+        self.figures: Final[list[tuple[str, str, go.Figure]]] = list()
+
+    def add_figure(self, fig: go.Figure, plot_kind: str, name: str) -> None:
+        self.figures.append((plot_kind, name, fig))
+
+    def write_html(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as report_file:
+            report_file.write(self.to_html())
+
+    def to_html(self) -> str:
+        # Figures are added run by run, so group them by plot kind, in the order each kind first appeared
+        figures_per_plot_kind: Final[dict[str, list[tuple[str, go.Figure]]]] = dict()
+        for plot_kind, name, fig in self.figures:
+            figures_per_plot_kind.setdefault(plot_kind, list()).append((name, fig))
+
+        sections: list[str] = list()
+        index: int = 0
+        for plot_kind, figures in figures_per_plot_kind.items():
+            sections.append(f"<h2>{html.escape(plot_kind.replace('_', ' ').title())}</h2>")
+            for name, fig in figures:
+                # "</" is escaped so figure text can never close the script element early
+                figure_json: str = json.dumps(self._encode_figure(fig), cls=PlotlyJSONEncoder).replace("</", "<\\/")
+                height: int = fig.layout.height or 450
+                sections.append(
+                    f"<h3>{html.escape(name)}</h3>\n"
+                    f'<script type="application/json" id="figure-{index}">{figure_json}</script>\n'
+                    f'<div data-figure="figure-{index}" style="height: {height}px;"></div>'
+                )
+                index += 1
+
+        mathjax: Final[str] = _MATHJAX_SCRIPT if self.include_mathjax else ""
+        body: Final[str] = "\n".join(sections)
+        return (
+            "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+            f"<title>{html.escape(self.title)}</title>\n{mathjax}"
+            f"<script>{get_plotlyjs()}</script>\n</head>\n<body>\n"
+            f"<h1>{html.escape(self.title)}</h1>\n{body}\n"
+            f"<script>{_DECODE_AND_LAZY_PLOT_JS}</script>\n</body>\n</html>\n"
+        )
+
+    @classmethod
+    def _encode_figure(cls, fig: go.Figure) -> dict:
+        figure_dict: Final[dict] = fig.to_plotly_json()
+        figure_dict["data"] = [
+            cls._encode_object(trace, trace_dict) for trace, trace_dict in zip(fig.data, figure_dict["data"])
+        ]
+        return figure_dict
+
+    @classmethod
+    def _encode_object(cls, plotly_object: BasePlotlyType, object_dict: dict) -> dict:
+        """Encode the data arrays of a trace, and of nested objects such as marker.color or error_y.array.
+        Only properties that plotly defines as arrays are encoded, not e.g. the [0, 1] of a domain."""
+        encoded: Final[dict] = dict()
+        for key, value in object_dict.items():
+            validator = plotly_object._get_validator(key) if key in plotly_object else None
+            if isinstance(validator, DataArrayValidator) or getattr(validator, "array_ok", False):
+                encoded[key] = cls._encode_array(value)
+            elif isinstance(value, dict) and isinstance(plotly_object[key], BasePlotlyType):
+                encoded[key] = cls._encode_object(plotly_object[key], value)
+            else:
+                encoded[key] = value
+        return encoded
+
+    @staticmethod
+    def _encode_array(value):
+        """Numeric trace arrays become {"dtype", "bdata"}; everything else is left for JSON"""
+        if not isinstance(value, (np.ndarray, list, tuple)) or len(value) == 0:
+            return value
+        try:
+            array: np.ndarray = np.asarray(value)
+        except ValueError:  # Ragged nested lists
+            return value
+        if array.ndim != 1 or array.dtype.kind not in "iuf":
+            return value
+
+        if array.dtype.name not in _DTYPE_CODES:  # e.g. int64, which JavaScript has no typed array for
+            array = array.astype(np.float64)
+        array = array.astype(array.dtype.newbyteorder("<"))
+        return {"dtype": _DTYPE_CODES[array.dtype.name], "bdata": base64.b64encode(array.tobytes()).decode("ascii")}
@@ -6,13 +6,29 @@ import plotly.graph_objects as go
 import pandas as pd
 from plotly.subplots import make_subplots
 
+from src.report_builder import ReportBuilder
+
 from time import sleep
 
 
 class ResultPlotter:
-    def __init__(self, fluid_name: str):
+    def __init__(self, fluid_name: str, report: ReportBuilder | None = None):
         self.fluid_name: Final[str] = fluid_name
         self.output_folder: Final[str] = "output/"
+        self.report: Final[ReportBuilder | None] = report
+
+    def save_figure(self, fig: go.Figure, plot_kind: str, is_cooling: bool | None = None) -> None:
+        """Write the figure to output/<plot_kind>/<fluid>.pdf, and add it to the report if there is one.
+        Plots made for both heating and cooling runs pass is_cooling, giving e.g. <fluid>-cooling.pdf"""
+        name: Final[str] = self.fluid_name if is_cooling is None \
+            else f"{self.fluid_name}-{'cooling' if is_cooling else 'heating'}"
+        fig.show()
+        output_path = os.path.join(self.output_folder, plot_kind)
+        os.makedirs(output_path, exist_ok=True)
+        fig.write_image(os.path.join(output_path, f"{name}.pdf"))
+
+        if self.report is not None:
+            self.report.add_figure(fig=fig, plot_kind=plot_kind, name=name)
 
     def plot_fluid_and_cell_temperature_vs_time(self, metrics_and_temp_df: pd.DataFrame):
         fluid_temp_1 = metrics_and_temp_df["Channel 7 Ave. (C)"][0]
@@ -60,11 +76,7 @@ class ResultPlotter:
             rangemode="tozero",
         )
 
-        fig.show()
-        output_path = os.path.join(self.output_folder, "phase")
-        os.makedirs(output_path, exist_ok=True)
-        fig.write_image(os.path.join(output_path, f"transmittances.pdf"))
-
+        self.save_figure(fig=fig, plot_kind="temperature_vs_time")
 
     def plot_characteristics_vs_fluid_temperature(self, metrics_and_temp_df: pd.DataFrame, cell_area: float, is_cooling: bool) -> None:
         #NB: subtract initial cell temperature so they begin from same value
@@ -186,10 +198,7 @@ class ResultPlotter:
             )
         )
 
-        fig.show()
-        output_path = os.path.join(self.output_folder, f"characteristics_vs_fluid_temperature")
-        os.makedirs(output_path, exist_ok=True)
-        fig.write_image(os.path.join(output_path, f"{self.fluid_name}.pdf"))
+        self.save_figure(fig=fig, plot_kind="characteristics_vs_fluid_temperature", is_cooling=is_cooling)
 
     def plot_characteristics_vs_time(self, metrics_and_temp_df: pd.DataFrame, cell_area: float, is_cooling: bool) -> None:
         fig = make_subplots(rows=2, cols=2, horizontal_spacing=0.2, vertical_spacing=0.32)
@@ -306,10 +315,7 @@ class ResultPlotter:
             )
         )
 
-        fig.show()
-        output_path = os.path.join(self.output_folder, f"characteristics_vs_time")
-        os.makedirs(output_path, exist_ok=True)
-        fig.write_image(os.path.join(output_path, f"{self.fluid_name}.pdf"))
+        self.save_figure(fig=fig, plot_kind="characteristics_vs_time", is_cooling=is_cooling)
 
     def plot_characteristics_vs_cell_temperature(self, metrics_and_temp_df: pd.DataFrame, cell_area: float) -> None:
         fig = make_subplots(rows=2, cols=2, horizontal_spacing=0.2)
@@ -421,10 +427,7 @@ class ResultPlotter:
             )
         )
 
-        fig.show()
-        output_path = os.path.join(self.output_folder, f"characteristics_vs_cell_temperature")
-        os.makedirs(output_path, exist_ok=True)
-        fig.write_image(os.path.join(output_path, f"{self.fluid_name}.pdf"))
+        self.save_figure(fig=fig, plot_kind="characteristics_vs_cell_temperature")
 
     """
     def plot_phase(self, simulated_populations: SimulatedPopulations):
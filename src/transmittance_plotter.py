@@ -3,9 +3,12 @@ import plotly.express as px
 from typing import Final
 import pandas as pd
 
+from src.report_builder import ReportBuilder
+
 class TransmittancePlotter:
-    def __init__(self):
+    def __init__(self, report: ReportBuilder | None = None):
         self.output_folder: Final[str] = "output/"
+        self.report: Final[ReportBuilder | None] = report
 
     def plot_phase(self, spectral_intensities: pd.DataFrame) -> None:
         fig = px.scatter(
@@ -54,4 +57,7 @@ class TransmittancePlotter:
         fig.show()
         output_path = os.path.join(self.output_folder, "phase")
         os.makedirs(output_path, exist_ok=True)
-        fig.write_image(os.path.join(output_path, f"transmittances.pdf"))
\ No newline at end of file
+        fig.write_image(os.path.join(output_path, f"transmittances.pdf"))
+
+        if self.report is not None:
+            self.report.add_figure(fig=fig, plot_kind="phase", name="transmittances")
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import os
+import threading
+
+import pandas as pd
+
+from src.analysis_server import AnalysisServer, DatasetCache
+
+
+def test_dataset_cache_reloads_after_dependency_changes(tmp_path):
+    dependency = tmp_path / "metrics.csv"
+    dependency.write_text("value\n1\n")
+    loads: list[str] = list()
+
+    def load() -> str:
+        loads.append(dependency.read_text())
+        return loads[-1]
+
+    async def get_twice_around_rewrite(cache: DatasetCache) -> list[str]:
+        values = [await cache.get(key=("metrics",), load=load, dependency_paths=lambda: [str(dependency)])]
+        values.append(await cache.get(key=("metrics",), load=load, dependency_paths=lambda: [str(dependency)]))
+        dependency.write_text("value\n2\n")
+        os.utime(dependency, ns=(0, os.stat(dependency).st_mtime_ns + 1))
+        values.append(await cache.get(key=("metrics",), load=load, dependency_paths=lambda: [str(dependency)]))
+        return values
+
+    values = asyncio.run(get_twice_around_rewrite(DatasetCache()))
+    assert values == ["value\n1\n", "value\n1\n", "value\n2\n"]
+    assert len(loads) == 2
+
+
+def test_derived_entry_follows_the_modified_times_of_its_source(tmp_path):
+    dependency = tmp_path / "metrics.csv"
+    dependency.write_text("1")
+
+    async def derive_around_rewrite(cache: DatasetCache) -> list[int]:
+        source, modified_times = await cache.get_entry(key=("metrics",), load=dependency.read_text,
+                                                       dependency_paths=lambda: [str(dependency)])
+        # The file changes after the source was loaded but before the derived value is
+        dependency.write_text("2")
+        os.utime(dependency, ns=(0, os.stat(dependency).st_mtime_ns + 1))
+        values = [await cache.get(key=("double",), load=lambda: 2*int(source), modified_times=modified_times)]
+
+        source, modified_times = await cache.get_entry(key=("metrics",), load=dependency.read_text,
+                                                       dependency_paths=lambda: [str(dependency)])
+        values.append(await cache.get(key=("double",), load=lambda: 2*int(source), modified_times=modified_times))
+        return values
+
+    assert asyncio.run(derive_around_rewrite(DatasetCache())) == [2, 4]
+
+
+def test_dataset_cache_shares_concurrent_loads():
+    release = threading.Event()
+    loads: list[int] = list()
+
+    def load() -> int:
+        loads.append(1)
+        release.wait(timeout=5)
+        return 42
+
+    async def get_concurrently(cache: DatasetCache) -> list[int]:
+        requests = [asyncio.create_task(cache.get(key=("calculator",), load=load, dependency_paths=list))
+                    for _ in range(5)]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*requests)
+
+    assert asyncio.run(get_concurrently(DatasetCache())) == [42]*5
+    assert len(loads) == 1
+
+
+def test_dataset_cache_evicts_least_recently_used():
+    async def fill(cache: DatasetCache) -> None:
+        for key in ["a", "b", "a", "c"]:
+            await cache.get(key=(key,), load=lambda: key, dependency_paths=list)
+
+    cache = DatasetCache(max_entries=2)
+    asyncio.run(fill(cache))
+    assert list(cache._entries) == [("a",), ("c",)]
+
+
+def test_respond_status_codes():
+    server = AnalysisServer()
+
+    async def fail(query: dict[str, str], body: bytes) -> str:
+        raise RuntimeError("broken")
+
+    server.routes[("GET", "/broken")] = fail
+
+    def respond(request_line: str, body: bytes = b"") -> tuple[str, dict]:
+        status, response_body = asyncio.run(server.respond(request_line, body=body))
+        return status, json.loads(response_body)
+
+    assert respond("GET /coefficients HTTP/1.1") == ("400 Bad Request", {"error": "missing parameter fluid"})
+    assert respond("GET /metrics?fluid=water&cooling=maybe HTTP/1.1")[0] == "400 Bad Request"
+    assert respond("POST /power HTTP/1.1")[0] == "400 Bad Request"
+    assert respond("POST /power HTTP/1.1", body=b"Wavelength,water\n500,1\n")[0] == "400 Bad Request"
+    assert respond("POST /metrics HTTP/1.1")[0] == "405 Method Not Allowed"
+    assert respond("GET /unknown HTTP/1.1")[0] == "404 Not Found"
+    assert respond("GET /metrics?fluid=nope HTTP/1.1") == ("404 Not Found", {"error": "no heating run for nope"})
+    assert respond("GET /coefficients?fluid=_temperatures HTTP/1.1")[0] == "404 Not Found"
+    assert respond("GET /broken HTTP/1.1") == ("500 Internal Server Error", {"error": "RuntimeError: broken"})
+
+    async def fail_lookup(query: dict[str, str], body: bytes) -> str:
+        return {}["bug"]
+
+    server.routes[("GET", "/broken")] = fail_lookup
+    assert respond("GET /broken HTTP/1.1")[0] == "500 Internal Server Error"
+
+
+def test_power_fluid_names(monkeypatch):
+    class StubCalculator:
+        spectral_intensities = pd.DataFrame(columns=["air", "water", "rhodaine-2pc"])
+
+        def get_electrical_powers(self, fluid_names: list[str]) -> pd.Series:
+            return pd.Series(data=1.0, index=fluid_names)
+
+        def get_thermal_powers(self, electrical_powers: pd.Series) -> pd.Series:
+            return electrical_powers/2
+
+    server = AnalysisServer()
+
+    async def get_calculator(spectrum_csv: bytes | None = None) -> StubCalculator:
+        return StubCalculator()
+
+    monkeypatch.setattr(server, "get_calculator", get_calculator)
+
+    def respond(request_line: str, body: bytes = b"") -> tuple[str, dict]:
+        status, response_body = asyncio.run(server.respond(request_line, body=body))
+        return status, json.loads(response_body)
+
+    # spectral_data.csv spells the column rhodaine-2pc
+    assert respond("GET /power?fluid=rhodamine-2pc HTTP/1.1") == (
+        "200 OK", {"electrical_power": 1.0, "thermal_power": 0.5})
+    assert respond("GET /power?fluid=nope HTTP/1.1") == ("404 Not Found", {"error": "no spectrum for nope"})
+    assert respond("POST /power HTTP/1.1", body=b"spectrum")[1] == {
+        "water": {"electrical_power": 1.0, "thermal_power": 0.5},
+        "rhodaine-2pc": {"electrical_power": 1.0, "thermal_power": 0.5}}
+
+
+def test_request_bodies_are_bounded_and_may_end_early():
+    async def exchange(raw_request: bytes) -> bytes:
+        server = AnalysisServer(max_body_bytes=16)
+        tcp_server = await asyncio.start_server(server.handle_connection, host="127.0.0.1", port=0)
+        async with tcp_server:
+            reader, writer = await asyncio.open_connection(*tcp_server.sockets[0].getsockname()[:2])
+            writer.write(raw_request)
+            writer.write_eof()
+            response = await reader.read()
+            writer.close()
+            return response.split(b"\r\n", 1)[0]
+
+    assert asyncio.run(exchange(b"POST /power HTTP/1.1\r\nContent-Length: 17\r\n\r\n")) == \
+        b"HTTP/1.1 413 Content Too Large"
+    assert asyncio.run(exchange(b"POST /power HTTP/1.1\r\nContent-Length: 10\r\n\r\nabc")) == \
+        b"HTTP/1.1 400 Bad Request"
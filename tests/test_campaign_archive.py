@@ -0,0 +1,108 @@
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+from src.campaign_archive import CampaignArchive, RawCampaignLayout, open_campaign_archive
+
+
+def write_zip(path: str, members: dict[str, str], date_times: dict[str, tuple] | None = None) -> str:
+    with zipfile.ZipFile(path, "w") as zip_file:
+        for name, content in members.items():
+            info = zipfile.ZipInfo(name, date_time=(date_times or dict()).get(name, (2022, 11, 14, 11, 0, 0)))
+            zip_file.writestr(info, content)
+    return path
+
+
+def test_read_csv_reuses_parsed_result(tmp_path, monkeypatch):
+    archive = CampaignArchive(write_zip(str(tmp_path / "runs.zip"), {"runs/a.csv": "time,value\n0,1\n1,2\n"}))
+    parse_calls: list[str] = list()
+    parse_csv = archive._parse_csv
+    monkeypatch.setattr(archive, "_parse_csv", lambda info, **kwargs: parse_calls.append(info.filename) or
+                        parse_csv(info, **kwargs))
+
+    first = archive.read_csv("runs/a.csv", usecols=["time"])
+    first["time"] = -1  # Callers get a copy, so the cached result cannot be modified through it
+    second = archive.read_csv("runs/a.csv", usecols=["time"])
+
+    assert parse_calls == ["runs/a.csv"]
+    assert list(second.columns) == ["time"]
+    assert list(second["time"]) == [0, 1]
+
+
+def test_read_csv_parses_uncacheable_arguments(tmp_path):
+    archive = CampaignArchive(write_zip(str(tmp_path / "runs.zip"), {"runs/a.csv": "time,value\n0,1\n"}))
+    assert list(archive.read_csv("runs/a.csv", usecols=lambda column: column == "value").columns) == ["value"]
+
+
+def test_read_csv_evicts_least_recently_used(tmp_path):
+    members = {f"runs/{index}.csv": "value\n1\n" for index in range(3)}
+    archive = CampaignArchive(write_zip(str(tmp_path / "runs.zip"), members), max_cached_csvs=2)
+    archive.read_csvs(list(members))
+    assert len(archive._parsed_csvs) == 2
+
+
+def test_read_csv_missing_member(tmp_path):
+    archive = CampaignArchive(write_zip(str(tmp_path / "runs.zip"), {"runs/a.csv": "value\n1\n"}))
+    with pytest.raises(FileNotFoundError):
+        archive.read_csv("runs/b.csv")
+
+
+def test_open_campaign_archive_replaces_rewritten_archive(tmp_path):
+    path = write_zip(str(tmp_path / "runs.zip"), {"runs/a.csv": "value\n1\n"})
+    first = open_campaign_archive(path)
+    assert open_campaign_archive(path) is first
+
+    # Replaced as a whole, as a sync or re-export does, so the previous file stays readable through open handles
+    os.replace(write_zip(str(tmp_path / "runs-new.zip"), {"runs/b.csv": "value\n2\n"}), path)
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 1_000_000_000))
+    second = open_campaign_archive(path)
+
+    assert second is not first
+    assert list(second.members) == ["runs/b.csv"]
+    # A load still holding the previous instance can finish with it
+    assert list(first.read_csv("runs/a.csv")["value"]) == [1]
+
+
+def test_raw_layout_times_from_member_modification_times(tmp_path):
+    metrics = "Pixel,Maximum Power (W)\nPixel 1,0.1\n"
+    picolog = "\"\",\"Channel 3 Ave. (C)\",\"Channel 7 Ave. (C)\"\n" + "".join(
+        f"\"00:0{minute}:{second:02d}\",{20 + minute},{19 + minute}\n" for minute in range(4) for second in range(60))
+    members = {
+        "pvt-data/water/Device 1 Metrics.csv": metrics,
+        "pvt-data/water/Device 1 Metrics (2).csv": metrics,
+        "pvt-data/water/Device 1 Metrics (3).csv": metrics,
+        "pvt-data/picolog/water.csv": picolog,
+    }
+    date_times = {
+        "pvt-data/water/Device 1 Metrics.csv": (2022, 11, 14, 11, 27, 0),
+        "pvt-data/water/Device 1 Metrics (2).csv": (2022, 11, 14, 11, 29, 50),
+        "pvt-data/water/Device 1 Metrics (3).csv": (2022, 11, 14, 11, 20, 0),  # Re-saved out of order
+    }
+    layout = RawCampaignLayout(CampaignArchive(write_zip(str(tmp_path / "pvt-data.zip"), members, date_times)))
+
+    picolog_data = layout.read_picolog("water")
+    times = layout.get_temperature_times("water", is_cooling=False, logged_times=picolog_data.index)
+
+    assert list(layout.get_metrics_members("water", is_cooling=False)) == ["(1)", "(2)"]
+    assert times.to_dict(orient="list") == {"suffix": ["(1)", "(2)"], "time": ["00:00:00", "00:02:50"]}
+    with pytest.raises(FileNotFoundError):
+        layout.read_picolog("air")
+
+
+def test_raw_layout_spectra_from_spectrasuite_exports(tmp_path):
+    def spectrum(intensities: list[float]) -> str:
+        rows = "".join(f"{wavelength}\t{intensity}\n"
+                       for wavelength, intensity in zip([399.5, 400.0, 400.5], intensities))
+        return ("SpectraSuite Data File\n>>>>>Begin Processed Spectral Data<<<<<\n"
+                f"{rows}>>>>>End Processed Spectral Data<<<<<\n")
+
+    # The first pixel reads zero for every fluid, and spectral_data.csv leaves it out
+    members = {"spectra/air.txt": spectrum([0, 10, 20]), "spectra/water.txt": spectrum([0, 5, 10])}
+    layout = RawCampaignLayout(CampaignArchive(write_zip(str(tmp_path / "spectra.zip"), members)))
+
+    pd.testing.assert_frame_equal(
+        layout.read_spectral_intensities(),
+        pd.DataFrame(data={"air": [10.0, 20.0], "water": [5.0, 10.0]},
+                     index=pd.Index([400.0, 400.5], name="wavelength (nm)")))
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.electrical_and_thermal_power import ElectricalThermalPowerCalculator
+from src.energy_yield_simulator import EnergyYieldSimulator
+
+
+class StubCalculator:
+    def get_electrical_powers(self, fluid_names: list[str]) -> pd.Series:
+        return pd.Series(data=[100.0*(index + 1) for index in range(len(fluid_names))], index=fluid_names)
+
+    def get_thermal_powers(self, electrical_powers: pd.Series) -> pd.Series:
+        return electrical_powers/10
+
+
+def write_weather(path, frequency: str, years: int = 1, sites: int = 1, irradiance: float = 500,
+                  interleaved: bool = False) -> str:
+    index = pd.date_range("2021-01-01", "2021-01-01" if years == 0 else f"{2021 + years}-01-01", freq=frequency,
+                          inclusive="left", name="time")
+    weather = pd.concat([
+        pd.DataFrame(data={"Irradiance (W m-2)": irradiance, "Ambient Temperature (C)": 25.0, "site": site},
+                     index=index)
+        for site in range(sites)
+    ])
+    if interleaved:  # Sorted by time, then site
+        weather = weather.sort_index(kind="stable")
+    weather.to_csv(path)
+    return str(path)
+
+
+def make_simulator(**kwargs) -> EnergyYieldSimulator:
+    # With noct=20 the cell stays at ambient temperature, so no derating applies at 25 °C
+    return EnergyYieldSimulator(calculator=StubCalculator(), noct=20,
+                                temperature_coefficients=pd.Series({"air": -0.004, "water": -0.004}), **kwargs)
+
+
+def test_annual_energy_independent_of_sampling(tmp_path):
+    hourly = write_weather(tmp_path / "hourly.csv", frequency="h")
+    quarter_hourly = write_weather(tmp_path / "quarter-hourly.csv", frequency="15min")
+
+    hourly_electrical, _ = make_simulator().get_annual_energy_from_file(hourly)
+    quarter_hourly_electrical, _ = make_simulator().get_annual_energy_from_file(quarter_hourly)
+
+    pd.testing.assert_frame_equal(hourly_electrical, quarter_hourly_electrical)
+    assert hourly_electrical.loc[(0, 2021), "air"] == pytest.approx(0.5*100*8760)
+
+
+def test_annual_sums_across_chunk_boundaries(tmp_path):
+    weather = write_weather(tmp_path / "weather.csv", frequency="h", years=2, sites=3)
+
+    whole_electrical, whole_thermal = make_simulator().get_annual_energy_from_file(weather, chunksize=10**7)
+    # 1001 rows per chunk splits site-years, and leaves a lone row in the last chunk
+    chunked_electrical, chunked_thermal = make_simulator().get_annual_energy_from_file(weather, chunksize=1001)
+
+    assert len(whole_electrical) == 6
+    pd.testing.assert_frame_equal(whole_electrical, chunked_electrical)
+    pd.testing.assert_frame_equal(whole_thermal, chunked_thermal)
+    assert chunked_electrical.loc[(2, 2022), "water"] == pytest.approx(0.5*200*8760)
+
+
+@pytest.mark.parametrize("chunksize", [13139, 26278])
+def test_annual_sums_of_sites_interleaved_in_time(tmp_path, chunksize):
+    weather = write_weather(tmp_path / "weather.csv", frequency="h", sites=3, interleaved=True)
+
+    whole_electrical, _ = make_simulator().get_annual_energy_from_file(weather, chunksize=10**6)
+    # The last chunk holds a single row for each of two sites, so has no spacing of its own
+    chunked_electrical, _ = make_simulator().get_annual_energy_from_file(weather, chunksize=chunksize)
+
+    pd.testing.assert_frame_equal(whole_electrical, chunked_electrical)
+    assert chunked_electrical.loc[(1, 2021), "air"] == pytest.approx(0.5*100*8760)
+
+
+def test_gap_at_chunk_boundary_is_refused(tmp_path):
+    path = write_weather(tmp_path / "weather.csv", frequency="h", years=0)
+    index = pd.date_range("2021-01-01", periods=48, freq="h", name="time").delete(24)
+    pd.DataFrame(data={"Irradiance (W m-2)": 500.0, "Ambient Temperature (C)": 25.0}, index=index).to_csv(path)
+
+    # Each 24-row chunk is evenly spaced; only the step across the boundary is two hours
+    with pytest.raises(ValueError):
+        make_simulator().get_annual_energy_from_file(path, chunksize=24)
+
+
+def test_uneven_time_steps_are_refused(tmp_path):
+    weather = pd.DataFrame(data={"Irradiance (W m-2)": 500.0, "Ambient Temperature (C)": 25.0},
+                           index=pd.to_datetime(["2021-01-01 00:00", "2021-01-01 01:00", "2021-01-01 01:15"]))
+    with pytest.raises(ValueError):
+        make_simulator().simulate(weather)
+
+    electrical, _ = make_simulator(time_step_hours=1.0).simulate(weather)
+    assert electrical["air"].sum() == pytest.approx(3*0.5*100)
+
+
+def test_electrical_powers_use_real_wavelengths():
+    calculator = ElectricalThermalPowerCalculator.__new__(ElectricalThermalPowerCalculator)
+    calculator.spectra_df = pd.Series(data=[1.0, 1.0], index=[200.0, 1200.0])
+    calculator.am1_5g_spectra_df = pd.DataFrame(data={"Cumulative photon flux (cm–2⋅s–1)": [2.0, 2.0]},
+                                                index=[250, 2000])
+    # Sampled on an uneven grid that does not start at row 0 = 0 nm: only real wavelengths may matter
+    wavelengths = np.array([400.0, 400.4, 401.1, 500.0, 500.5, 600.0])
+    calculator.spectral_intensities = pd.DataFrame(data={"air": 10.0, "water": [5.0, 5.0, 5.0, 5.0, 10.0, 10.0]},
+                                                   index=wavelengths)
+
+    electrical_powers = calculator.get_electrical_powers(["air", "water"])
+
+    # Integrated over 400-600 nm, where all three series were measured
+    assert electrical_powers["air"] == pytest.approx(2*200)
+    assert electrical_powers["water"] == pytest.approx(2*(100*0.5 + 1*0.75 + 99*1.0))
+    # The incident spectrum is integrated over the same 400-600 nm
+    assert calculator.get_thermal_powers(electrical_powers)["air"] == pytest.approx(2*200/200)
+    assert calculator.get_electrical_power() == pytest.approx(electrical_powers["air"])
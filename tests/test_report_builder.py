@@ -0,0 +1,79 @@
+import base64
+import os
+import re
+
+import numpy as np
+import plotly.graph_objects as go
+
+from src.report_builder import ReportBuilder
+from src.result_plotters import ResultPlotter
+
+
+def decode(encoded: dict) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(encoded["bdata"]), dtype=f"<{encoded['dtype']}")
+
+
+def test_encode_array_round_trips_numeric_arrays():
+    encoded = ReportBuilder._encode_array(np.array([1.5, -2.0, 3.25]))
+    assert encoded["dtype"] == "f8"
+    assert list(decode(encoded)) == [1.5, -2.0, 3.25]
+
+    # int64 has no JavaScript typed array, so it is widened to float64
+    encoded_ints = ReportBuilder._encode_array([1, 2, 3])
+    assert encoded_ints["dtype"] == "f8"
+    assert list(decode(encoded_ints)) == [1.0, 2.0, 3.0]
+    assert ReportBuilder._encode_array(np.array([1, 2], dtype=np.uint8))["dtype"] == "u1"
+
+
+def test_encode_array_leaves_non_numeric_values():
+    assert ReportBuilder._encode_array(["a", "b"]) == ["a", "b"]
+    assert ReportBuilder._encode_array([]) == []
+    assert ReportBuilder._encode_array([[1, 2], [3, 4]]) == [[1, 2], [3, 4]]
+    assert ReportBuilder._encode_array("lines") == "lines"
+
+
+def test_encode_figure_encodes_nested_arrays():
+    fig = go.Figure(go.Scatter(x=[1.0, 2.0], y=[3.0, 4.0], marker={"color": [0.1, 0.2]},
+                               error_y={"array": [0.5, 0.6]}, text=["a", "b"]))
+    fig.add_trace(go.Pie(values=[1.0, 2.0], domain={"x": [0, 0.5]}))
+    scatter, pie = ReportBuilder._encode_figure(fig)["data"]
+
+    assert list(decode(scatter["x"])) == [1.0, 2.0]
+    assert list(decode(scatter["marker"]["color"])) == [0.1, 0.2]
+    assert list(decode(scatter["error_y"]["array"])) == [0.5, 0.6]
+    assert scatter["text"] == ["a", "b"]
+    assert list(decode(pie["values"])) == [1.0, 2.0]
+    assert list(pie["domain"]["x"]) == [0, 0.5]  # An info array, not data
+
+
+def test_to_html_groups_figures_by_plot_kind():
+    report = ReportBuilder(include_mathjax=False)
+    for fluid_name in ["water", "glycerol"]:
+        report.add_figure(go.Figure(), plot_kind="power_vs_temperature", name=f"{fluid_name} power")
+        report.add_figure(go.Figure(), plot_kind="temperature_vs_time", name=f"{fluid_name} temperature")
+
+    headings = re.findall(r"<h[23]>(.*?)</h[23]>", report.to_html())
+    assert headings == ["Power Vs Temperature", "water power", "glycerol power",
+                        "Temperature Vs Time", "water temperature", "glycerol temperature"]
+    assert len(set(re.findall(r'id="(figure-\d+)"', report.to_html()))) == 4
+
+
+def test_heating_and_cooling_figures_are_kept_apart(tmp_path, monkeypatch):
+    written: list[str] = list()
+    monkeypatch.setattr(go.Figure, "show", lambda fig: None)
+    monkeypatch.setattr(go.Figure, "write_image", lambda fig, path: written.append(path))
+    report = ReportBuilder(include_mathjax=False)
+    plotter = ResultPlotter(fluid_name="rhodamine-2pc", report=report)
+    monkeypatch.setattr(plotter, "output_folder", str(tmp_path))
+
+    for is_cooling in [False, True]:
+        plotter.save_figure(go.Figure(), plot_kind="characteristics_vs_fluid_temperature", is_cooling=is_cooling)
+    plotter.save_figure(go.Figure(), plot_kind="temperature_vs_time")
+
+    assert [os.path.relpath(path, tmp_path) for path in written] == [
+        os.path.join("characteristics_vs_fluid_temperature", "rhodamine-2pc-heating.pdf"),
+        os.path.join("characteristics_vs_fluid_temperature", "rhodamine-2pc-cooling.pdf"),
+        os.path.join("temperature_vs_time", "rhodamine-2pc.pdf"),
+    ]
+    assert [name for _, name, _ in report.figures] == ["rhodamine-2pc-heating", "rhodamine-2pc-cooling",
+                                                      "rhodamine-2pc"]